@@ -18,4 +18,17 @@ START_DUTY_HOUR = 6.5
 
 
 # OpenRouteService API Key
-OPENROUTESERVICE_API_KEY = os.getenv('OPENROUTESERVICE_API_KEY', '')
\ No newline at end of file
+OPENROUTESERVICE_API_KEY = os.getenv('OPENROUTESERVICE_API_KEY', '')
+# Seconds a parsed OpenRouteService response stays cached
+ORS_CACHE_TIMEOUT = 60 * 60 * 24
+# Decimals kept when keying the cache on coordinates (5 decimals ~ 1 meter)
+ORS_COORDS_PRECISION = 5
+# Maximum concurrent OpenRouteService requests (also sizes the connection pool)
+ORS_MAX_WORKERS = 8
+# (connect, read) timeout in seconds for OpenRouteService requests
+ORS_TIMEOUT = (3.05, 10)
+# Retries (with exponential backoff) on connection errors and 429/502/503/504 answers
+ORS_MAX_RETRIES = 3
+# Consecutive failures before OpenRouteService calls fail fast, and for how many seconds
+ORS_BREAKER_FAILURES = 5
+ORS_BREAKER_RESET_TIMEOUT = 30
\ No newline at end of file
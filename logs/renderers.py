@@ -0,0 +1,37 @@
+"""DRF renderers for the logs API."""
+import orjson
+from rest_framework.renderers import JSONRenderer
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSON renderer serializing responses with orjson instead of the stdlib json module.
+    
+    Output matches JSONRenderer's compact form: datetimes, dataclasses and non-str
+    dict keys are passed to DRF's encoder instead of orjson's own handling. The one
+    difference left is that NaN and infinities render as null instead of raising.
+    Indented responses (requested via ``application/json; indent=N``) are left to
+    JSONRenderer.
+    """
+    
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Render `data` into JSON, returning a bytestring.
+        
+        Args:
+            data: Response data to serialize
+            accepted_media_type (str, optional): Media type negotiated for the response
+            renderer_context (dict, optional): Context passed by the view
+        
+        Returns:
+            bytes: The JSON document
+        """
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        ret = orjson.dumps(
+            data,
+            default=self.encoder_class().default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_NON_STR_KEYS,
+        )
+        # Escape \u2028 and \u2029 like JSONRenderer so the output stays a strict javascript subset
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
@@ -4,10 +4,191 @@ This module provides utilities for:
 - Calculating distances between coordinates using OpenRouteService API
 - Generating DOT-compliant driving schedules based on HOS regulations
 """
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
+from functools import lru_cache
+import hashlib
+import logging
+import threading
+import time
+from typing import NamedTuple
 
 from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+METERS_TO_MILES = 0.000621371
+
+
+class HOSSettings(NamedTuple):
+    """Values of the settings the HOS schedule depends on, part of the schedule cache key."""
+    START_DUTY_HOUR: float
+    PRE_TRIP_INSPECTION_TIME: float
+    MAX_DRIVING_PER_DAY: float
+    MAX_DRIVE_WINDOW: float
+    MAX_CYCLE_HOURS: float
+    BREAK_AFTER: float
+    BREAK_DURATION: float
+    AVG_SPEED_MPH: float
+    MILES_BEFORE_FUEL: float
+    FUELING_DURATION: float
+    PICKUP_TIME: float
+    DROPOFF_TIME: float
+    SLEEPER_BREAK_HOURS: float
+    REST_AFTER_CYCLE: float
+
+
+HOS_SETTING_NAMES = HOSSettings._fields
+
+
+def _load_hos_settings():
+    """Read every HOS setting once through Django's lazy settings proxy.
+    
+    Returns:
+        HOSSettings: Current value of each setting in HOS_SETTING_NAMES
+    """
+    return HOSSettings(*(getattr(settings, name) for name in HOS_SETTING_NAMES))
+
+
+# Snapshot used by default by StepsGenerator, refreshed when a HOS setting changes (e.g. override_settings)
+_hos_settings = _load_hos_settings()
+
+
+@receiver(setting_changed)
+def _reload_hos_settings(setting, **kwargs):
+    """Refresh the HOS settings snapshot when one of them changes."""
+    global _hos_settings
+    if setting in HOS_SETTING_NAMES:
+        _hos_settings = _load_hos_settings()
+
+
+# Decimals kept for hours and miles in API responses (4 decimals of an hour is under a second)
+SEGMENT_DECIMALS = 4
+
+
+class InvalidCoordinatesError(ValueError):
+    """Raised when a waypoint is not a valid [longitude, latitude] pair."""
+
+
+class InvalidResponseError(requests.RequestException):
+    """Raised when OpenRouteService answers with a body that is not a usable route."""
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Raised instead of calling a service while its circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Fails fast while a remote service keeps failing.
+    
+    After ``failure_threshold`` consecutive failures the circuit opens and calls are
+    rejected for ``reset_timeout`` seconds. The next call after that is let through
+    as a trial while other callers keep being rejected: a success closes the
+    circuit, a failure opens it again. A trial that never reports back only holds
+    the circuit for another ``reset_timeout``.
+    
+    Attributes:
+        failure_threshold (int): Consecutive failures that open the circuit
+        reset_timeout (float): Seconds the circuit stays open
+    """
+    
+    def __init__(self, failure_threshold, reset_timeout):
+        """Initialize a closed circuit breaker.
+        
+        Args:
+            failure_threshold (int): Consecutive failures that open the circuit
+            reset_timeout (float): Seconds the circuit stays open
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+    
+    def before_call(self):
+        """Check that a call may proceed.
+        
+        Raises:
+            CircuitOpenError: If the circuit is open
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return
+            now = time.monotonic()
+            if now - self._opened_at < self.reset_timeout:
+                raise CircuitOpenError("Service temporarily unavailable, not calling it")
+            # Half-open: let this call through as the trial and keep rejecting the others
+            self._opened_at = now
+    
+    def record_success(self):
+        """Close the circuit after a successful call."""
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+    
+    def record_failure(self):
+        """Count a failed call, opening the circuit once the threshold is reached.
+        
+        A failure while the circuit is open (a failed trial) reopens it right away.
+        """
+        with self._lock:
+            self._failures += 1
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+
+# Shared by every DistaneCalculator so an outage is detected across requests
+ORS_CIRCUIT_BREAKER = CircuitBreaker(settings.ORS_BREAKER_FAILURES, settings.ORS_BREAKER_RESET_TIMEOUT)
+
+
+def _build_session():
+    """Build the keep-alive session used for OpenRouteService calls.
+    
+    The pool keeps one connection per concurrent batch worker, and transient
+    failures are retried with a short, capped exponential backoff. The final
+    error response is returned rather than raised so its details reach the caller.
+    
+    Returns:
+        requests.Session: Session with a pooled, retrying HTTPS adapter
+    """
+    session = requests.Session()
+    retries = Retry(
+        total=settings.ORS_MAX_RETRIES,
+        backoff_factor=0.3,
+        status_forcelist=[429, 502, 503, 504],
+        allowed_methods=["POST"],
+        raise_on_status=False,
+        # Retry-After is unbounded (urllib3 sleeps for the full value), so only our own
+        # capped backoff is used and a retried call stays within a few seconds
+        respect_retry_after_header=False,
+        backoff_max=2,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.ORS_MAX_WORKERS, max_retries=retries)
+    session.mount("https://", adapter)
+    return session
+
+
+# Module-level so every request served by this process reuses the TCP/TLS connections
+_SESSION = _build_session()
+
+
+class RouteSummary(NamedTuple):
+    """The parts of an OpenRouteService route the application uses.
+    
+    Attributes:
+        distances (tuple): Distance of each leg between consecutive waypoints, in meters
+        geometry (str): Encoded polyline of the whole route
+    """
+    distances: tuple
+    geometry: str
 
 
 class DistaneCalculator:
@@ -16,34 +197,295 @@ class DistaneCalculator:
     Attributes:
         endpoint (str): The OpenRouteService API endpoint URL
         headers (dict): HTTP headers including API authorization
+        session (requests.Session): Keep-alive session reusing connections between calls
+        breaker (CircuitBreaker): Circuit breaker guarding the API calls
     """
     
-    def __init__(self, endpoint):
+    def __init__(self, endpoint, session=None):
         """Initialize the distance calculator.
         
         Args:
             endpoint (str): The OpenRouteService API endpoint URL
+            session (requests.Session, optional): Session to send requests with.
+                Defaults to the keep-alive session shared by every calculator
         """
         self.endpoint = endpoint
         self.headers = {
             'Authorization': settings.OPENROUTESERVICE_API_KEY,
             'Content-Type': 'application/json'
         }
+        # Share the module-level pool by default so connections outlive this instance
+        self.session = _SESSION if session is None else session
+        self.breaker = ORS_CIRCUIT_BREAKER
+    
+    def _normalize(self, coordinates):
+        """Validate waypoints and round them to the cache precision.
+        
+        Coordinates are rounded to ``settings.ORS_COORDS_PRECISION`` decimals so
+        near-identical trips share the same cached route.
+        
+        Args:
+            coordinates (list): Waypoints as [longitude, latitude] pairs
+            
+        Returns:
+            tuple: Rounded (longitude, latitude) pairs
+            
+        Raises:
+            InvalidCoordinatesError: If a waypoint is not a valid [longitude, latitude] pair
+        """
+        precision = settings.ORS_COORDS_PRECISION
+        rounded = []
+        for point in coordinates:
+            try:
+                lng, lat = (float(value) for value in point)
+            except (TypeError, ValueError, OverflowError) as exc:
+                raise InvalidCoordinatesError(f"Invalid coordinates {point!r}: expected [longitude, latitude]") from exc
+            if not (-180 <= lng <= 180 and -90 <= lat <= 90):
+                raise InvalidCoordinatesError(f"Invalid coordinates {list(point)}: expected [longitude, latitude]")
+            rounded.append((round(lng, precision), round(lat, precision)))
+        return tuple(rounded)
+    
+    def _cache_key(self, rounded):
+        """Build the cache key for a list of normalized waypoints.
+        
+        Args:
+            rounded (tuple): Waypoints as returned by ``_normalize``
+            
+        Returns:
+            str: Cache key scoped to the endpoint
+        """
+        digest = hashlib.blake2b(repr((self.endpoint, rounded)).encode(), digest_size=16).hexdigest()
+        return f"ors:route:{digest}"
+    
+    def _fetch(self, coordinates):
+        """Request a route from the API and extract its summary.
+        
+        The body is parsed with orjson and only the leg distances and geometry are
+        kept, so the response (and its instructions) can be released right away.
+        
+        Args:
+            coordinates (list): Waypoints as [longitude, latitude] pairs
+            
+        Returns:
+            RouteSummary: Leg distances and geometry of the route
+            
+        Raises:
+            CircuitOpenError: If the API kept failing and is not called for now
+            InvalidResponseError: If the API answers with a body that is not a route
+            requests.RequestException: If the API cannot be reached in time
+            requests.HTTPError: If the API answers with an error status
+        """
+        self.breaker.before_call()
+        try:
+            response = self.session.post(
+                self.endpoint,
+                # Serialized with orjson; self.headers already declares the JSON content type
+                data=orjson.dumps({"coordinates": coordinates}),
+                headers=self.headers,
+                timeout=settings.ORS_TIMEOUT,
+            )
+        except requests.RequestException:
+            self.breaker.record_failure()
+            raise
+        if settings.DEBUG:
+            logger.debug("ORS %s %s", response.status_code, response.text[:512])
+        # Only outages, rate limiting and unusable bodies count against the API, not rejected input
+        if response.status_code == 429 or response.status_code >= 500:
+            self.breaker.record_failure()
+        elif not response.ok:
+            self.breaker.record_success()
+        response.raise_for_status()
+        try:
+            route = orjson.loads(response.content)["routes"][0]
+            summary = RouteSummary(
+                distances=tuple(segment["distance"] for segment in route["segments"]),
+                geometry=route["geometry"],
+            )
+        except (ValueError, LookupError, TypeError) as exc:
+            # e.g. an HTML page from a proxy answered with a 200
+            self.breaker.record_failure()
+            raise InvalidResponseError(f"Unexpected OpenRouteService response: {exc}", response=response) from exc
+        self.breaker.record_success()
+        return summary
     
     def calculate_distance(self, start_coords, pickup_coords, dropoff_coords):
         """Calculate total distance across multiple waypoints.
         
+        Responses are cached so repeated trips skip the network round trip, and
+        invalid or degenerate trips are resolved without calling the API at all.
+        
         Args:
-            start_coords (list): Starting coordinates [latitude, longitude]
-            pickup_coords (list): Pickup location coordinates [latitude, longitude]
-            dropoff_coords (list): Dropoff location coordinates [latitude, longitude]
+            start_coords (list): Starting coordinates [longitude, latitude]
+            pickup_coords (list): Pickup location coordinates [longitude, latitude]
+            dropoff_coords (list): Dropoff location coordinates [longitude, latitude]
             
         Returns:
-            requests.Response: API response containing distance information
+            RouteSummary: Start->pickup and pickup->dropoff distances and route geometry
+            
+        Raises:
+            InvalidCoordinatesError: If a waypoint is not a valid [longitude, latitude] pair
+            requests.HTTPError: If the API answers with an error status
         """
-        body = {"coordinates": [start_coords, pickup_coords, dropoff_coords]}
-        response = requests.post(self.endpoint, json=body, headers=self.headers)
-        return response
+        coordinates = [start_coords, pickup_coords, dropoff_coords]
+        rounded = self._normalize(coordinates)
+        if len(set(rounded)) == 1:
+            # Every waypoint is the same place: there is nothing to route
+            return RouteSummary(distances=(0.0, 0.0), geometry="")
+        # Errors propagate out of the loader, so failed lookups are never cached
+        return cache.get_or_set(
+            self._cache_key(rounded),
+            lambda: self._fetch(coordinates),
+            timeout=settings.ORS_CACHE_TIMEOUT,
+        )
+    
+    def calculate_distances_batch(self, routes):
+        """Calculate several independent routes concurrently.
+        
+        Cached routes are answered directly; the remaining ones are requested in
+        parallel over the shared session, so the total latency is that of the
+        slowest call rather than the sum of all calls.
+        
+        Args:
+            routes (list): Waypoint lists, e.g. [start_coords, pickup_coords, dropoff_coords]
+            
+        Returns:
+            list: RouteSummary of each route, in the same order as ``routes``
+            
+        Raises:
+            InvalidCoordinatesError: If a waypoint is not a valid [longitude, latitude] pair
+            requests.HTTPError: If the API answers any request with an error status
+        """
+        keys = []
+        results = {}
+        for coordinates in routes:
+            rounded = self._normalize(coordinates)
+            key = self._cache_key(rounded)
+            keys.append(key)
+            if len(set(rounded)) == 1:
+                # Every waypoint is the same place: there is nothing to route
+                results[key] = RouteSummary(distances=(0.0,) * (len(rounded) - 1), geometry="")
+        results.update(cache.get_many([key for key in keys if key not in results]))
+        missing = {key: coordinates for key, coordinates in zip(keys, routes) if key not in results}
+        if missing:
+            workers = min(settings.ORS_MAX_WORKERS, len(missing))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {key: executor.submit(self._fetch, coordinates) for key, coordinates in missing.items()}
+            fetched = {}
+            error = None
+            for key, future in futures.items():
+                try:
+                    fetched[key] = future.result()
+                except Exception as exc:
+                    error = error or exc
+            # Keep the routes that did come back, so a retry only requests the failed ones
+            cache.set_many(fetched, settings.ORS_CACHE_TIMEOUT)
+            if error is not None:
+                raise error
+            results.update(fetched)
+        return [results[key] for key in keys]
+    
+    def calculate_distance_legs(self, start_coords, pickup_coords, dropoff_coords):
+        """Calculate the start->pickup and pickup->dropoff legs as two concurrent requests.
+        
+        Useful when each leg has to be queried on its own; legs already cached
+        (e.g. a pickup->dropoff leg shared by several trips) are not requested again.
+        
+        Args:
+            start_coords (list): Starting coordinates [longitude, latitude]
+            pickup_coords (list): Pickup location coordinates [longitude, latitude]
+            dropoff_coords (list): Dropoff location coordinates [longitude, latitude]
+            
+        Returns:
+            tuple: RouteSummary of the (start->pickup, pickup->dropoff) legs
+            
+        Raises:
+            InvalidCoordinatesError: If a waypoint is not a valid [longitude, latitude] pair
+            requests.HTTPError: If the API answers either request with an error status
+        """
+        to_pickup, to_dropoff = self.calculate_distances_batch([
+            [start_coords, pickup_coords],
+            [pickup_coords, dropoff_coords],
+        ])
+        return to_pickup, to_dropoff
+    
+    def close(self):
+        """Close a session passed to this calculator and release its connections.
+        
+        The shared session is left open for the other calculators.
+        """
+        if self.session is not _SESSION:
+            self.session.close()
+
+
+@dataclass(frozen=True, slots=True)
+class Segment:
+    """A single segment of the driving schedule.
+    
+    Attributes:
+        status (str): Duty status (DRIVING, ON_DUTY, OFF_DUTY, SLEEPER)
+        duration (float): Duration in hours
+        label (str): Human-readable description of the segment
+        start_hour (float): Starting hour of the day (0-23)
+        end_hour (float): Ending hour of the day (0-23)
+        elapsed_start (float): Total elapsed hours from start when the segment begins
+        elapsed_end (float): Total elapsed hours from start when the segment ends
+        day_number (int): Day of the trip the segment belongs to, starting at 1
+        miles_moved (float): Miles traveled in this segment
+    """
+    status: str
+    duration: float
+    label: str
+    start_hour: float
+    end_hour: float
+    elapsed_start: float
+    elapsed_end: float
+    day_number: int
+    miles_moved: float = 0
+    
+    def to_dict(self):
+        """Serialize the segment for API responses.
+        
+        Hours and miles are rounded to ``SEGMENT_DECIMALS`` decimals: they carry no
+        meaningful precision beyond that, and the shorter numbers both shrink the
+        JSON payload and hide float drift such as 23.999999999999996. Hours of day
+        are wrapped after rounding, so drift just before midnight serializes as 0.0.
+        
+        Returns:
+            dict: Segment fields keyed by name
+        """
+        return {
+            "status": self.status,
+            "duration": round(self.duration, SEGMENT_DECIMALS),
+            "label": self.label,
+            "start_hour": round(self.start_hour, SEGMENT_DECIMALS) % 24,
+            "end_hour": round(self.end_hour, SEGMENT_DECIMALS) % 24,
+            "elapsed_start": round(self.elapsed_start, SEGMENT_DECIMALS),
+            "elapsed_end": round(self.elapsed_end, SEGMENT_DECIMALS),
+            "day_number": self.day_number,
+            "miles_moved": round(self.miles_moved, SEGMENT_DECIMALS)
+        }
+
+
+@dataclass(slots=True)
+class _LoopState:
+    """Counters tracked by the HOS simulation while it builds a schedule.
+    
+    Attributes:
+        current_hour (float): Current hour of day (0-23)
+        cycle_remaining (float): Remaining hours in current cycle
+        total_elapsed (float): Total hours elapsed since start
+        current_drive_window (float): Hours spent in current 14-hour window
+        current_drive_accumulated (float): Total driving hours in current day
+        drive_accumulated_since_last_break (float): Hours driven since last break
+        miles_since_fuel (float): Miles driven since last fueling
+    """
+    current_hour: float
+    cycle_remaining: float
+    total_elapsed: float = 0.0
+    current_drive_window: float = 0.0
+    current_drive_accumulated: float = 0.0
+    drive_accumulated_since_last_break: float = 0.0
+    miles_since_fuel: float = 0.0
 
 
 class StepsGenerator:
@@ -56,17 +498,21 @@ class StepsGenerator:
     - 8-day cycle resets
     
     Attributes:
+        hos_settings (HOSSettings): HOS settings the schedule is built with
         cycle_remaining (float): Remaining hours in current 168-hour cycle
     """
     
-    def __init__(self, cycle_used_hrs=0):
+    def __init__(self, cycle_used_hrs=0, hos_settings=None):
         """Initialize the steps generator.
         
         Args:
             cycle_used_hrs (float, optional): Hours already used in current cycle. Defaults to 0.
+            hos_settings (HOSSettings, optional): HOS settings to build schedules with.
+                Defaults to the current Django settings.
         """
+        self.hos_settings = _hos_settings if hos_settings is None else hos_settings
         # Calculate remaining hours in current 168-hour (8-day) cycle
-        self.cycle_remaining = settings.MAX_CYCLE_HOURS - float(cycle_used_hrs)
+        self.cycle_remaining = self.hos_settings.MAX_CYCLE_HOURS - float(cycle_used_hrs)
     
     def _create_segment(self, status, duration, label, start_hour, elapsed_start, miles_moved=0):
         """Create a single segment of the driving schedule.
@@ -80,25 +526,26 @@ class StepsGenerator:
             miles_moved (float, optional): Miles traveled in this segment. Defaults to 0.
             
         Returns:
-            dict: Segment dictionary with timing and status information
+            Segment: Segment with timing and status information
         """
-        return {
-            "status": status,
-            "duration": duration,
-            "label": label,
-            "start_hour": start_hour,
-            "end_hour": (start_hour + duration) % 24,
-            "elapsed_start": elapsed_start,
-            "elapsed_end": elapsed_start + duration,
-            "day_number": int(elapsed_start // 24) + 1,
-            "miles_moved": miles_moved
-        }
+        return Segment(
+            status=status,
+            duration=duration,
+            label=label,
+            start_hour=start_hour,
+            end_hour=(start_hour + duration) % 24,
+            elapsed_start=elapsed_start,
+            elapsed_end=elapsed_start + duration,
+            day_number=int(elapsed_start // 24) + 1,
+            miles_moved=miles_moved
+        )
 
-    def manage_create_segment(self, status, duration, label, start_hour, elapsed_start, steps, miles_moved=0):
-        """Create a segment, splitting across midnight if necessary.
+    def _emit_segment(self, status, duration, label, start_hour, elapsed_start, miles_moved=0):
+        """Yield a segment of the schedule, splitting it across midnight if necessary.
         
-        This method handles segments that span multiple days by splitting them
-        into separate segments at the midnight boundary.
+        Segments spanning multiple days are split at every midnight boundary they
+        cross (a 34-hour restart can cross two); every piece is yielded. Use with
+        ``yield from`` to get the position reached after the segment.
         
         Args:
             status (str): Duty status (DRIVING, ON_DUTY, OFF_DUTY, SLEEPER)
@@ -106,93 +553,160 @@ class StepsGenerator:
             label (str): Human-readable description
             start_hour (int): Starting hour of the day (0-23)
             elapsed_start (float): Total elapsed hours from start
-            steps (list): List to append segment to
             miles_moved (float, optional): Miles to distribute. Defaults to 0.
             
+        Yields:
+            Segment: Each piece of the segment, in order
+            
         Returns:
-            dict: The segment dictionary for the portion after midnight (if split), or the full segment
+            tuple: (end_hour, elapsed_end) of the last piece
         """
         rest_of_days = elapsed_start % 24
-        if rest_of_days + duration > 24:  # Segment spans midnight
-            # Split segment into two parts: before and after midnight
-            first_part_duration = 24 - rest_of_days
-            first_part_miles = (miles_moved * first_part_duration) / duration if miles_moved else 0
-            segment1 = self._create_segment(status, first_part_duration, label, start_hour, elapsed_start, miles_moved=first_part_miles)
-            steps.append(segment1)
-            # Create second part starting at midnight
-            new_elapsed_start = elapsed_start + first_part_duration
-            second_part_duration = duration - first_part_duration
-            segment2 = self._create_segment(status, second_part_duration, label, 0, new_elapsed_start, miles_moved=miles_moved - first_part_miles)
-            return segment2
-        else:
-            # Segment fits within same day
-            segment = self._create_segment(status, duration, label, start_hour, elapsed_start, miles_moved=miles_moved)
-            return segment
+        # Split segment at each midnight, the remainder starting at 00:00
+        while rest_of_days + duration > 24:
+            part_duration = 24 - rest_of_days
+            part_miles = (miles_moved * part_duration) / duration if miles_moved else 0
+            yield self._create_segment(status, part_duration, label, start_hour, elapsed_start, miles_moved=part_miles)
+            elapsed_start += part_duration
+            duration -= part_duration
+            miles_moved -= part_miles
+            start_hour, rest_of_days = 0, 0
+        seg = self._create_segment(status, duration, label, start_hour, elapsed_start, miles_moved=miles_moved)
+        yield seg
+        return seg.end_hour, seg.elapsed_end
+
+    def _emit_on_duty(self, duration, label, state):
+        """Yield an on-duty (not driving) stop and charge it to the window and cycle.
         
+        Used for the pre-trip inspection, pickup, fueling and drop-off stops so
+        their time is accounted for the same way everywhere.
+        
+        Args:
+            duration (float): Duration in hours
+            label (str): Human-readable description
+            state (_LoopState): Simulation counters, updated in place
+            
+        Yields:
+            Segment: Each piece of the stop (split across midnight if necessary)
+        """
+        state.current_hour, state.total_elapsed = yield from self._emit_segment("ON_DUTY", duration, label, state.current_hour, state.total_elapsed)
+        state.current_drive_window += duration
+        state.cycle_remaining -= duration
 
     def generate_steps(self, dist_to_pickup_meters, dist_to_dropoff_meters):
         """Generate a complete HOS-compliant driving schedule.
         
         Creates a detailed timeline of activities (driving, on-duty, breaks, sleep) that
         complies with DOT Hours of Service regulations from start through dropoff.
+        The schedule only depends on the distances, the remaining cycle hours and the
+        HOS settings, so it is memoized on those.
         
         Args:
             dist_to_pickup_meters (float): Distance from start to pickup in meters
             dist_to_dropoff_meters (float): Distance from pickup to dropoff in meters
             
         Returns:
-            list: List of segments, each containing timing and status information
+            list: List of Segment objects, each containing timing and status information
+        """
+        steps, self.cycle_remaining = _cached_schedule(
+            float(dist_to_pickup_meters), float(dist_to_dropoff_meters), self.cycle_remaining, self.hos_settings
+        )
+        return list(steps)
+
+    @staticmethod
+    def summary(steps):
+        """Aggregate a schedule into trip totals in a single pass.
+        
+        Args:
+            steps (list): Segments as returned by generate_steps
+            
+        Returns:
+            dict: Total miles, elapsed/driving/on-duty hours and number of days
+        """
+        total_miles = driving_hours = on_duty_hours = 0.0
+        for step in steps:
+            total_miles += step.miles_moved
+            if step.status == "DRIVING":
+                driving_hours += step.duration
+            elif step.status == "ON_DUTY":
+                on_duty_hours += step.duration
+        last = steps[-1] if steps else None
+        return {
+            "total_miles": round(total_miles, SEGMENT_DECIMALS),
+            "total_hours": round(last.elapsed_end, SEGMENT_DECIMALS) if last else 0.0,
+            "driving_hours": round(driving_hours, SEGMENT_DECIMALS),
+            "on_duty_hours": round(on_duty_hours, SEGMENT_DECIMALS),
+            "days": last.day_number if last else 0,
+        }
+
+    def iter_steps(self, dist_to_pickup_meters, dist_to_dropoff_meters):
+        """Run the HOS simulation, yielding segments as they are produced.
+        
+        Unlike generate_steps this is not memoized; it lets consumers process a
+        schedule one segment at a time.
+        
+        Args:
+            dist_to_pickup_meters (float): Distance from start to pickup in meters
+            dist_to_dropoff_meters (float): Distance from pickup to dropoff in meters
+            
+        Yields:
+            Segment: Each segment of the schedule, in chronological order
         """
+        # Bind the HOS constants to locals for the loop
+        hos = self.hos_settings
+        start_duty_hour = hos.START_DUTY_HOUR
+        pre_trip_inspection_time = hos.PRE_TRIP_INSPECTION_TIME
+        max_driving_per_day = hos.MAX_DRIVING_PER_DAY
+        max_drive_window = hos.MAX_DRIVE_WINDOW
+        max_cycle_hours = hos.MAX_CYCLE_HOURS
+        break_after = hos.BREAK_AFTER
+        break_duration = hos.BREAK_DURATION
+        avg_speed_mph = hos.AVG_SPEED_MPH
+        miles_before_fuel = hos.MILES_BEFORE_FUEL
+        fueling_duration = hos.FUELING_DURATION
+        pickup_time = hos.PICKUP_TIME
+        dropoff_time = hos.DROPOFF_TIME
+        sleeper_break_hours = hos.SLEEPER_BREAK_HOURS
+        rest_after_cycle = hos.REST_AFTER_CYCLE
+        cycle_restart_label = f"{rest_after_cycle}h Cycle Restart"
+        break_label = f"{break_duration}h Break"
+        sleep_label = f"{sleeper_break_hours}-hour Sleep"
+        
         # Convert distances from meters to miles
-        dist_to_pickup_miles = dist_to_pickup_meters * 0.000621371
-        dist_to_dropoff_miles = dist_to_dropoff_meters * 0.000621371
+        dist_to_pickup_miles = dist_to_pickup_meters * METERS_TO_MILES
+        dist_to_dropoff_miles = dist_to_dropoff_meters * METERS_TO_MILES
         
         # Initialize tracking variables
-        steps = []  # List of all driving segments
-        current_hour = settings.START_DUTY_HOUR  # Current hour of day (0-23)
-        total_elapsed = 0.0  # Total hours elapsed since start
-        current_drive_window = 0.0  # Hours driven in current 14-hour window
-        current_drive_accumulated = 0.0  # Total driving hours in current day
-        drive_accumulated_since_last_break = 0.0  # Hours driven since last break
-        miles_since_fuel = 0.0  # Miles driven since last fueling
+        state = _LoopState(current_hour=start_duty_hour, cycle_remaining=self.cycle_remaining)
         # Add initial OFF_DUTY segment if starting partway through the day
-        if current_hour > 0:
-            seg = self.manage_create_segment("OFF_DUTY", current_hour, "OFF_DUTY", 0, total_elapsed, steps)
-            steps.append(seg)
-            total_elapsed += current_hour
-            current_hour = seg["end_hour"]
+        if state.current_hour > 0:
+            state.current_hour, state.total_elapsed = yield from self._emit_segment("OFF_DUTY", state.current_hour, "OFF_DUTY", 0, state.total_elapsed)
         
         # Add pre-trip inspection
-        seg = self.manage_create_segment("ON_DUTY", settings.PRE_TRIP_INSPECTION_TIME, "Pre-trip Inspection", current_hour, total_elapsed, steps)
-        steps.append(seg)
-        current_hour = seg["end_hour"]
-        total_elapsed += settings.PRE_TRIP_INSPECTION_TIME
-        current_drive_window += settings.PRE_TRIP_INSPECTION_TIME
-        self.cycle_remaining -= settings.PRE_TRIP_INSPECTION_TIME
+        yield from self._emit_on_duty(pre_trip_inspection_time, "Pre-trip Inspection", state)
         
         # Initialize distance and pickup tracking
         remaining_dist = dist_to_pickup_miles + dist_to_dropoff_miles
         pickup_done = False
-        # Main driving loop - continues until all distance is covered
+        # Main driving loop - continues until all distance is covered.
+        # Each iteration jumps straight to the next limit or stop and emits at least
+        # one segment, so the work is linear in the size of the returned schedule.
         while remaining_dist > 0:
             # Check if 8-day cycle limit reached - requires extended rest
-            if self.cycle_remaining <= 0:
-                seg = self.manage_create_segment("OFF_DUTY", settings.REST_AFTER_CYCLE, f"{settings.REST_AFTER_CYCLE}h Cycle Restart", current_hour, total_elapsed, steps)
-                steps.append(seg)
-                current_hour = seg["end_hour"]
-                total_elapsed += settings.REST_AFTER_CYCLE
+            if state.cycle_remaining <= 0:
+                state.current_hour, state.total_elapsed = yield from self._emit_segment("OFF_DUTY", rest_after_cycle, cycle_restart_label, state.current_hour, state.total_elapsed)
                 # Reset cycle and all driving counters
-                self.cycle_remaining = settings.MAX_CYCLE_HOURS
-                current_drive_window, current_drive_accumulated, drive_accumulated_since_last_break = 0, 0, 0
+                state.cycle_remaining = max_cycle_hours
+                state.current_drive_window, state.current_drive_accumulated, state.drive_accumulated_since_last_break = 0, 0, 0
             
             # Calculate constraints for next driving segment
             dist_to_next_stop = dist_to_pickup_miles if not pickup_done else remaining_dist
             
             # Remaining time until hitting various limits
-            left_time_driving_per_day = settings.MAX_DRIVING_PER_DAY - current_drive_accumulated  # 11-hour limit
-            left_time_drive_window = settings.MAX_DRIVE_WINDOW - current_drive_window  # 14-hour window
-            left_time_before_break = settings.BREAK_AFTER - ((drive_accumulated_since_last_break % settings.BREAK_AFTER) if drive_accumulated_since_last_break else 0)  # Break every 8 hours
-            left_time_to_next_stop = dist_to_next_stop / settings.AVG_SPEED_MPH  # Time to reach next location
+            left_time_driving_per_day = max_driving_per_day - state.current_drive_accumulated  # 11-hour limit
+            left_time_drive_window = max_drive_window - state.current_drive_window  # 14-hour window
+            left_time_before_break = break_after - state.drive_accumulated_since_last_break  # Break every 8 hours
+            left_time_to_next_stop = dist_to_next_stop / avg_speed_mph  # Time to reach next location
             
             # Take the minimum - most restrictive constraint
             time_to_drive = min(
@@ -200,77 +714,67 @@ class StepsGenerator:
                 left_time_drive_window,
                 left_time_before_break,
                 left_time_to_next_stop,
-                self.cycle_remaining
+                state.cycle_remaining
             )
 
             # Add driving segment if time available
             if time_to_drive > 0:
-                miles_moved = time_to_drive * settings.AVG_SPEED_MPH
-                seg = self.manage_create_segment("DRIVING", time_to_drive, "Driving", current_hour, total_elapsed, steps, miles_moved=miles_moved)
-                steps.append(seg)
+                miles_moved = time_to_drive * avg_speed_mph
+                state.current_hour, state.total_elapsed = yield from self._emit_segment("DRIVING", time_to_drive, "Driving", state.current_hour, state.total_elapsed, miles_moved=miles_moved)
                 
                 # Update distance tracking
                 if not pickup_done: 
                     dist_to_pickup_miles -= miles_moved
                 remaining_dist -= miles_moved
-                miles_since_fuel += miles_moved
+                state.miles_since_fuel += miles_moved
                 
                 # Update all time counters
-                current_hour = seg["end_hour"]
-                total_elapsed += time_to_drive
-                current_drive_window += time_to_drive
-                current_drive_accumulated += time_to_drive
-                drive_accumulated_since_last_break += time_to_drive
-                self.cycle_remaining -= time_to_drive
+                state.current_drive_window += time_to_drive
+                state.current_drive_accumulated += time_to_drive
+                state.drive_accumulated_since_last_break += time_to_drive
+                state.cycle_remaining -= time_to_drive
             
             # Handle arrival at pickup location
             if not pickup_done and dist_to_pickup_miles <= 0:
-                seg = self.manage_create_segment("ON_DUTY", settings.PICKUP_TIME, "Pickup Loading", current_hour, total_elapsed, steps)
-                steps.append(seg)
-                current_hour = seg["end_hour"]
-                total_elapsed += settings.PICKUP_TIME
-                current_drive_window += settings.PICKUP_TIME
-                self.cycle_remaining -= settings.PICKUP_TIME
+                yield from self._emit_on_duty(pickup_time, "Pickup Loading", state)
                 pickup_done = True
             
             # Handle mandatory breaks and rest periods
-            if miles_since_fuel >= settings.MILES_BEFORE_FUEL:
+            if state.miles_since_fuel >= miles_before_fuel:
                 # Fueling stop (counts as on-duty time)
-                seg = self.manage_create_segment("ON_DUTY", settings.FUELING_DURATION, "Fueling", current_hour, total_elapsed, steps)
-                steps.append(seg)
-                current_hour = seg["end_hour"]
-                total_elapsed += settings.FUELING_DURATION
-                current_drive_window += settings.FUELING_DURATION
-                self.cycle_remaining -= settings.FUELING_DURATION
-                miles_since_fuel = 0
-            elif drive_accumulated_since_last_break >= settings.BREAK_AFTER:
+                yield from self._emit_on_duty(fueling_duration, "Fueling", state)
+                state.miles_since_fuel = 0
+            elif state.drive_accumulated_since_last_break >= break_after:
                 # 8-hour break required
-                seg = self.manage_create_segment("OFF_DUTY", settings.BREAK_DURATION, f"{settings.BREAK_DURATION}h Break", current_hour, total_elapsed, steps)
-                steps.append(seg)
-                current_hour = seg["end_hour"]
-                total_elapsed += settings.BREAK_DURATION
-                current_drive_window += settings.BREAK_DURATION
-                drive_accumulated_since_last_break = 0
-            elif (current_drive_accumulated >= settings.MAX_DRIVING_PER_DAY or current_drive_window >= settings.MAX_DRIVE_WINDOW):
+                state.current_hour, state.total_elapsed = yield from self._emit_segment("OFF_DUTY", break_duration, break_label, state.current_hour, state.total_elapsed)
+                state.current_drive_window += break_duration
+                state.drive_accumulated_since_last_break = 0
+            elif (state.current_drive_accumulated >= max_driving_per_day or state.current_drive_window >= max_drive_window):
                 # 10-hour sleep break required (resets daily limits)
-                seg = self.manage_create_segment("SLEEPER", settings.SLEEPER_BREAK_HOURS, "10-hour Sleep", current_hour, total_elapsed, steps)
-                steps.append(seg)
-                current_hour = seg["end_hour"]
-                total_elapsed += settings.SLEEPER_BREAK_HOURS
+                state.current_hour, state.total_elapsed = yield from self._emit_segment("SLEEPER", sleeper_break_hours, sleep_label, state.current_hour, state.total_elapsed)
                 # Reset all daily counters after sleep
-                current_drive_window, current_drive_accumulated, drive_accumulated_since_last_break = 0, 0, 0
+                state.current_drive_window, state.current_drive_accumulated, state.drive_accumulated_since_last_break = 0, 0, 0
         # Add final dropoff segment
-        seg = self.manage_create_segment("ON_DUTY", settings.DROPOFF_TIME, "Drop-off Unloading", current_hour, total_elapsed, steps)
-        steps.append(seg)
-        current_hour = seg["end_hour"]
-        total_elapsed += settings.DROPOFF_TIME
+        yield from self._emit_on_duty(dropoff_time, "Drop-off Unloading", state)
+        self.cycle_remaining = state.cycle_remaining
 
         # Add remaining OFF_DUTY time until end of day
-        left_time = 24 - (current_hour % 24)
+        left_time = 24 - (state.current_hour % 24)
         if left_time > 0:
-            seg = self._create_segment("OFF_DUTY", left_time, "OFF_DUTY", current_hour, total_elapsed)
-            steps.append(seg)
-            current_hour = seg["end_hour"]
-            total_elapsed += left_time
+            yield self._create_segment("OFF_DUTY", left_time, "OFF_DUTY", state.current_hour, state.total_elapsed)
 
-        return steps
+
+@lru_cache(maxsize=1024)
+def _cached_schedule(dist_to_pickup_meters, dist_to_dropoff_meters, cycle_remaining, hos_settings):
+    """Build and memoize a schedule for generate_steps.
+    
+    The schedule is built with ``hos_settings``, which is also part of the cache key,
+    so changing any HOS setting yields a fresh schedule.
+    
+    Returns:
+        tuple: (segments as a tuple, remaining cycle hours after the trip)
+    """
+    generator = StepsGenerator(hos_settings=hos_settings)
+    generator.cycle_remaining = cycle_remaining
+    steps = tuple(generator.iter_steps(dist_to_pickup_meters, dist_to_dropoff_meters))
+    return steps, generator.cycle_remaining
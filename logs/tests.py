@@ -1,9 +1,62 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from datetime import datetime, timezone
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import threading
+import time
 from unittest.mock import Mock, patch
-from logs.services import DistaneCalculator, StepsGenerator
+from logs.renderers import ORJSONRenderer
+from logs.services import (
+    CircuitBreaker,
+    CircuitOpenError,
+    DistaneCalculator,
+    InvalidCoordinatesError,
+    InvalidResponseError,
+    RouteSummary,
+    StepsGenerator,
+    _build_session,
+    _cached_schedule,
+)
+import orjson
 import requests
 
 
+def ors_response(distances, geometry="encoded-polyline"):
+    """Build a mocked OpenRouteService directions response with one segment per distance."""
+    mock_response = Mock(status_code=200, ok=True)
+    mock_response.content = orjson.dumps({
+        "routes": [{
+            "summary": {"distance": sum(distances)},
+            "segments": [{"distance": distance, "steps": []} for distance in distances],
+            "geometry": geometry,
+        }]
+    })
+    return mock_response
+
+
+def ors_echo(endpoint, data, **kwargs):
+    """Answer a mocked request with leg distances derived from the posted waypoints."""
+    coordinates = orjson.loads(data)["coordinates"]
+    return ors_response([point[0] * 1000 for point in coordinates[1:]])
+
+
+class RateLimitedHandler(BaseHTTPRequestHandler):
+    """Answer every request with a 429 asking the client to come back in 10 minutes."""
+    
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.send_response(429)
+        self.send_header("Retry-After", "600")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+    
+    def log_message(self, format, *args):
+        pass
+
+
 class DistanceCalculatorTests(TestCase):
     """Test suite for DistanceCalculator class."""
     
@@ -11,6 +64,8 @@ class DistanceCalculatorTests(TestCase):
         """Set up test fixtures before each test method."""
         self.test_endpoint = "https://api.openrouteservice.org/v2/matrix/driving"
         self.calculator = DistaneCalculator(self.test_endpoint)
+        self.calculator.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+        cache.clear()
     
     def test_init_sets_endpoint(self):
         """Test that initialization sets the endpoint correctly."""
@@ -21,7 +76,38 @@ class DistanceCalculatorTests(TestCase):
         self.assertIn('Authorization', self.calculator.headers)
         self.assertEqual(self.calculator.headers['Content-Type'], 'application/json')
     
-    @patch('logs.services.requests.post')
+    def test_init_shares_session_between_calculators(self):
+        """Test that calculators reuse the module-level keep-alive session."""
+        self.assertIsInstance(self.calculator.session, requests.Session)
+        self.assertIs(DistaneCalculator(self.test_endpoint).session, self.calculator.session)
+    
+    def test_init_retries_transient_failures(self):
+        """Test that the session retries rate limiting and gateway errors on POST."""
+        retries = self.calculator.session.get_adapter(self.test_endpoint).max_retries
+        
+        self.assertEqual(retries.total, 3)
+        self.assertEqual(set(retries.status_forcelist), {429, 502, 503, 504})
+        self.assertIn("POST", retries.allowed_methods)
+    
+    def test_calculate_distance_ignores_long_retry_after(self):
+        """Test that a 429 with a large Retry-After is retried briefly and then reported."""
+        server = HTTPServer(("127.0.0.1", 0), RateLimitedHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        session = _build_session()
+        session.mount("http://", session.get_adapter(self.test_endpoint))
+        calculator = DistaneCalculator(f"http://127.0.0.1:{server.server_port}/", session=session)
+        calculator.breaker = CircuitBreaker(failure_threshold=5, reset_timeout=30)
+        
+        started = time.monotonic()
+        with self.assertRaises(requests.HTTPError) as raised:
+            calculator.calculate_distance([0, 0], [1, 1], [2, 2])
+        
+        self.assertEqual(raised.exception.response.status_code, 429)
+        self.assertLess(time.monotonic() - started, 10)
+    
+    @patch('logs.services.requests.Session.post')
     def test_calculate_distance_calls_api(self, mock_post):
         """Test that calculate_distance makes correct API call."""
         # Setup
@@ -29,9 +115,7 @@ class DistanceCalculatorTests(TestCase):
         pickup_coords = [40.7580, -73.9855]  # Midtown
         dropoff_coords = [40.7489, -73.9680]  # East Side
         
-        mock_response = Mock()
-        mock_response.json.return_value = {"distances": [[0, 1000, 2000]]}
-        mock_post.return_value = mock_response
+        mock_post.return_value = ors_response([1000, 2000])
         
         # Execute
         result = self.calculator.calculate_distance(start_coords, pickup_coords, dropoff_coords)
@@ -40,18 +124,248 @@ class DistanceCalculatorTests(TestCase):
         mock_post.assert_called_once()
         call_args = mock_post.call_args
         self.assertEqual(call_args[0][0], self.test_endpoint)
-        self.assertEqual(call_args[1]['json']['coordinates'], [start_coords, pickup_coords, dropoff_coords])
+        self.assertEqual(orjson.loads(call_args[1]['data'])['coordinates'], [start_coords, pickup_coords, dropoff_coords])
+        self.assertEqual(call_args[1]['timeout'], (3.05, 10))
         self.assertEqual(call_args[1]['headers'], self.calculator.headers)
     
-    @patch('logs.services.requests.post')
-    def test_calculate_distance_returns_response(self, mock_post):
-        """Test that calculate_distance returns the API response."""
-        mock_response = Mock(spec=requests.Response)
-        mock_post.return_value = mock_response
+    @patch('logs.services.requests.Session.post')
+    def test_calculate_distance_returns_route_summary(self, mock_post):
+        """Test that calculate_distance returns the leg distances and geometry only."""
+        mock_post.return_value = ors_response([1000.5, 2000.25], geometry="abc")
         
         result = self.calculator.calculate_distance([0, 0], [1, 1], [2, 2])
         
-        self.assertEqual(result, mock_response)
+        self.assertEqual(result, RouteSummary(distances=(1000.5, 2000.25), geometry="abc"))
+    
+    @override_settings(DEBUG=True)
+    @patch('logs.services.requests.Session.post')
+    def test_calculate_distance_logs_responses_in_debug(self, mock_post):
+        """Test that ORS responses are logged, truncated, only when DEBUG is on."""
+        mock_response = ors_response([1000, 2000])
+        mock_response.text = "x" * 1000
+        mock_post.return_value = mock_response
+        
+        with self.assertLogs("logs.services", "DEBUG") as logs:
+            self.calculator.calculate_distance([0, 0], [1, 1], [2, 2])
+        
+        self.assertEqual(logs.records[0].getMessage(), "ORS 200 " + "x" * 512)
+    
+    @patch('logs.services.requests.Session.post')
+    def test_calculate_distance_uses_cache(self, mock_post):
+        """Test that repeated (and near-identical) trips skip the API call."""
+        mock_post.return_value = ors_response([1000, 2000])
+        
+        first = self.calculator.calculate_distance([0, 0], [1, 1], [2, 2])
+        second = self.calculator.calculate_distance([0, 0], [1.000001, 1], [2, 2])
+        
+        mock_post.assert_called_once()
+        self.assertEqual(first, second)
+    
+    @patch('logs.services.requests.Session.post')
+    def test_calculate_distance_does_not_cache_errors(self, mock_post):
+        """Test that error responses raise and are not cached."""
+        mock_response = Mock(status_code=404, ok=False)
+        mock_response.raise_for_status.side_effect = requests.HTTPError(response=mock_response)
+        mock_post.return_value = mock_response
+        
+        for _ in range(2):
+            with self.assertRaises(requests.HTTPError):
+                self.calculator.calculate_distance([0, 0], [1, 1], [2, 2])
+        
+        self.assertEqual(mock_post.call_count, 2)
+    
+    @patch('logs.services.requests.Session.post')
+    def test_calculate_distance_fails_fast_while_circuit_open(self, mock_post):
+        """Test that repeated outages open the circuit and stop calling the API."""
+        mock_post.side_effect = requests.ConnectionError("unreachable")
+        
+        for _ in range(2):
+            with self.assertRaises(requests.ConnectionError):
+                self.calculator.calculate_distance([0, 0], [1, 1], [2, 2])
+        with self.assertRaises(CircuitOpenError):
+            self.calculator.calculate_distance([0, 0], [1, 1], [2, 2])
+        
+        self.assertEqual(mock_post.call_count, 2)
+    
+    @patch('logs.services.requests.Session.post')
+    def test_calculate_distance_client_errors_keep_circuit_closed(self, mock_post):
+        """Test that rejected requests do not count as API outages."""
+        mock_response = Mock(status_code=404, ok=False)
+        mock_response.raise_for_status.side_effect = requests.HTTPError(response=mock_response)
+        mock_post.return_value = mock_response
+        
+        for _ in range(3):
+            with self.assertRaises(requests.HTTPError):
+                self.calculator.calculate_distance([0, 0], [1, 1], [2, 2])
+        
+        self.assertEqual(mock_post.call_count, 3)
+    
+    @patch('logs.services.requests.Session.post')
+    def test_calculate_distance_rejects_malformed_response(self, mock_post):
+        """Test that a 200 answer whose body is not a route counts as an API failure."""
+        mock_post.return_value = Mock(status_code=200, ok=True, content=b"<html>Bad gateway</html>")
+        
+        for _ in range(2):
+            with self.assertRaises(InvalidResponseError):
+                self.calculator.calculate_distance([0, 0], [1, 1], [2, 2])
+        with self.assertRaises(CircuitOpenError):
+            self.calculator.calculate_distance([0, 0], [1, 1], [2, 2])
+        
+        self.assertEqual(mock_post.call_count, 2)
+    
+    @patch('logs.services.requests.Session.post')
+    def test_calculate_distance_rejects_invalid_coordinates(self, mock_post):
+        """Test that out-of-range coordinates raise before any API call."""
+        with self.assertRaises(InvalidCoordinatesError):
+            self.calculator.calculate_distance([0, 0], [1, 95], [2, 2])
+        with self.assertRaises(InvalidCoordinatesError):
+            self.calculator.calculate_distance([-181, 0], [1, 1], [2, 2])
+        with self.assertRaises(InvalidCoordinatesError):
+            self.calculator.calculate_distance([0, 0], [1, None], [2, 2])
+        with self.assertRaises(InvalidCoordinatesError):
+            self.calculator.calculate_distance([0, 0], [10 ** 400, 1], [2, 2])
+        
+        mock_post.assert_not_called()
+    
+    @patch('logs.services.requests.Session.post')
+    def test_calculate_distance_skips_api_for_identical_waypoints(self, mock_post):
+        """Test that a trip whose waypoints are all the same place is not routed."""
+        result = self.calculator.calculate_distance([2, 2], [2, 2], [2.000001, 2])
+        
+        mock_post.assert_not_called()
+        self.assertEqual(result.distances, (0.0, 0.0))
+    
+    @patch('logs.services.requests.Session.post')
+    def test_calculate_distances_batch_keeps_order(self, mock_post):
+        """Test that batch results follow the order of the requested routes."""
+        mock_post.side_effect = ors_echo
+        routes = [[[0, 0], [1, 1], [2, 2]], [[3, 3], [4, 4], [5, 5]], [[6, 6], [7, 7], [8, 8]]]
+        
+        results = self.calculator.calculate_distances_batch(routes)
+        
+        self.assertEqual([result.distances for result in results], [(1000, 2000), (4000, 5000), (7000, 8000)])
+        self.assertEqual(mock_post.call_count, 3)
+    
+    @patch('logs.services.requests.Session.post')
+    def test_calculate_distances_batch_skips_cached_routes(self, mock_post):
+        """Test that cached and duplicate routes are not requested again."""
+        mock_post.return_value = ors_response([1000, 2000])
+        self.calculator.calculate_distance([0, 0], [1, 1], [2, 2])
+        mock_post.reset_mock()
+        
+        results = self.calculator.calculate_distances_batch([
+            [[0, 0], [1, 1], [2, 2]],
+            [[3, 3], [4, 4], [5, 5]],
+            [[3, 3], [4, 4], [5, 5]],
+        ])
+        
+        mock_post.assert_called_once()
+        self.assertEqual(len(results), 3)
+    
+    @patch('logs.services.requests.Session.post')
+    def test_calculate_distances_batch_caches_successes_on_failure(self, mock_post):
+        """Test that a failed route does not discard the routes fetched alongside it."""
+        def echo_or_fail(endpoint, data, **kwargs):
+            if orjson.loads(data)["coordinates"][0] == [3, 3]:
+                raise requests.ConnectionError("unreachable")
+            return ors_echo(endpoint, data, **kwargs)
+        mock_post.side_effect = echo_or_fail
+        routes = [[[0, 0], [1, 1], [2, 2]], [[3, 3], [4, 4], [5, 5]], [[6, 6], [7, 7], [8, 8]]]
+        
+        with self.assertRaises(requests.ConnectionError):
+            self.calculator.calculate_distances_batch(routes)
+        mock_post.reset_mock()
+        mock_post.side_effect = ors_echo
+        results = self.calculator.calculate_distances_batch(routes)
+        
+        mock_post.assert_called_once()
+        self.assertEqual([result.distances for result in results], [(1000, 2000), (4000, 5000), (7000, 8000)])
+    
+    @patch('logs.services.requests.Session.post')
+    def test_calculate_distance_legs_requests_each_leg(self, mock_post):
+        """Test that each leg is requested separately and returned in order."""
+        mock_post.side_effect = ors_echo
+        
+        to_pickup, to_dropoff = self.calculator.calculate_distance_legs([0, 0], [1, 1], [2, 2])
+        
+        self.assertEqual(mock_post.call_count, 2)
+        self.assertEqual(to_pickup.distances, (1000,))
+        self.assertEqual(to_dropoff.distances, (2000,))
+    
+    def test_close_closes_own_session(self):
+        """Test that close releases a session passed to the calculator."""
+        session = Mock()
+        
+        DistaneCalculator(self.test_endpoint, session=session).close()
+        
+        session.close.assert_called_once()
+    
+    @patch('logs.services.requests.Session.close')
+    def test_close_keeps_shared_session_open(self, mock_close):
+        """Test that close leaves the shared session to the other calculators."""
+        self.calculator.close()
+        
+        mock_close.assert_not_called()
+
+
+class CircuitBreakerTests(TestCase):
+    """Test suite for CircuitBreaker class."""
+    
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    
+    def test_success_resets_failure_count(self):
+        """Test that only consecutive failures open the circuit."""
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        
+        self.breaker.before_call()
+    
+    @patch('logs.services.time.monotonic')
+    def test_reopens_after_failed_trial(self, mock_monotonic):
+        """Test that the circuit lets a trial call through after the reset timeout."""
+        mock_monotonic.return_value = 100
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+        
+        mock_monotonic.return_value = 131
+        self.breaker.before_call()
+        self.breaker.record_failure()
+        
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+    
+    @patch('logs.services.time.monotonic')
+    def test_lets_a_single_trial_through(self, mock_monotonic):
+        """Test that only one caller is let through once the reset timeout has passed."""
+        mock_monotonic.return_value = 100
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        
+        mock_monotonic.return_value = 131
+        self.breaker.before_call()
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+        
+        self.breaker.record_success()
+        self.breaker.before_call()
+        self.breaker.before_call()
+    
+    @patch('logs.services.time.monotonic')
+    def test_stalled_trial_releases_circuit(self, mock_monotonic):
+        """Test that a trial that never reports back only blocks for another reset timeout."""
+        mock_monotonic.return_value = 100
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        mock_monotonic.return_value = 131
+        self.breaker.before_call()
+        
+        mock_monotonic.return_value = 162
+        self.breaker.before_call()
 
 
 class StepsGeneratorTests(TestCase):
@@ -60,6 +374,17 @@ class StepsGeneratorTests(TestCase):
     def setUp(self):
         """Set up test fixtures before each test method."""
         self.generator = StepsGenerator(cycle_used_hrs=0)
+        _cached_schedule.cache_clear()
+    
+    def _emit(self, *args, **kwargs):
+        """Run _emit_segment to completion, returning its pieces and final position."""
+        emitter = self.generator._emit_segment(*args, **kwargs)
+        steps = []
+        while True:
+            try:
+                steps.append(next(emitter))
+            except StopIteration as stop:
+                return steps, stop.value
     
     def test_init_sets_cycle_remaining(self):
         """Test that initialization calculates remaining cycle hours correctly."""
@@ -84,81 +409,122 @@ class StepsGeneratorTests(TestCase):
             miles_moved=150
         )
         
-        self.assertEqual(segment['status'], "DRIVING")
-        self.assertEqual(segment['duration'], 2.5)
-        self.assertEqual(segment['label'], "Test Drive")
-        self.assertEqual(segment['start_hour'], 10)
-        self.assertEqual(segment['elapsed_start'], 100)
-        self.assertEqual(segment['miles_moved'], 150)
-        self.assertIn('end_hour', segment)
-        self.assertIn('elapsed_end', segment)
-        self.assertIn('day_number', segment)
+        self.assertEqual(segment.status, "DRIVING")
+        self.assertEqual(segment.duration, 2.5)
+        self.assertEqual(segment.label, "Test Drive")
+        self.assertEqual(segment.start_hour, 10)
+        self.assertEqual(segment.elapsed_start, 100)
+        self.assertEqual(segment.miles_moved, 150)
+        self.assertEqual(segment.end_hour, 12.5)
+        self.assertEqual(segment.elapsed_end, 102.5)
+        self.assertEqual(segment.day_number, 5)
+    
+    def test_segment_to_dict(self):
+        """Test that to_dict exposes every segment field for the API response."""
+        segment = self.generator._create_segment("DRIVING", 2.5, "Test Drive", 10, 100, miles_moved=150)
+        
+        self.assertEqual(segment.to_dict(), {
+            "status": "DRIVING",
+            "duration": 2.5,
+            "label": "Test Drive",
+            "start_hour": 10,
+            "end_hour": 12.5,
+            "elapsed_start": 100,
+            "elapsed_end": 102.5,
+            "day_number": 5,
+            "miles_moved": 150
+        })
+    
+    def test_segment_to_dict_rounds_hours_and_miles(self):
+        """Test that to_dict drops precision beyond SEGMENT_DECIMALS."""
+        segment = self.generator._create_segment("DRIVING", 300 / 55, "Drive", 7, 7, miles_moved=299.99999999999994)
+        data = segment.to_dict()
+        
+        self.assertEqual(data['duration'], 5.4545)
+        self.assertEqual(data['end_hour'], 12.4545)
+        self.assertEqual(data['miles_moved'], 300.0)
+        
+        # A segment starting (or ending) a hair before midnight is serialized at 0.0, not 24.0
+        at_midnight = self.generator._create_segment("OFF_DUTY", 0.5, "0.5h Break", 23.999999999999996, 71.99999999999999)
+        self.assertEqual(at_midnight.to_dict()['start_hour'], 0.0)
+        ending = self.generator._create_segment("DRIVING", 2, "Drive", 21.999999999999996, 21.999999999999996)
+        self.assertEqual(ending.to_dict()['end_hour'], 0.0)
     
     def test_create_segment_calculates_day_number(self):
         """Test that day_number is calculated correctly."""
         # Day 1: 0-24 hours
         seg1 = self.generator._create_segment("ON_DUTY", 1, "Test", 10, 0)
-        self.assertEqual(seg1['day_number'], 1)
+        self.assertEqual(seg1.day_number, 1)
         
         # Day 2: 24-48 hours
         seg2 = self.generator._create_segment("ON_DUTY", 1, "Test", 10, 24)
-        self.assertEqual(seg2['day_number'], 2)
+        self.assertEqual(seg2.day_number, 2)
         
         # Day 3: 48-72 hours
         seg3 = self.generator._create_segment("ON_DUTY", 1, "Test", 10, 48)
-        self.assertEqual(seg3['day_number'], 3)
+        self.assertEqual(seg3.day_number, 3)
     
     def test_create_segment_calculates_end_hour(self):
         """Test that end_hour wraps around 24-hour clock."""
         # Starting at 22:00, 4-hour duration -> 02:00 next day
         segment = self.generator._create_segment("DRIVING", 4, "Test", 22, 0)
-        self.assertEqual(segment['end_hour'], 2)
+        self.assertEqual(segment.end_hour, 2)
         
         # Starting at 10:00, 8-hour duration -> 18:00 same day
         segment = self.generator._create_segment("DRIVING", 8, "Test", 10, 0)
-        self.assertEqual(segment['end_hour'], 18)
+        self.assertEqual(segment.end_hour, 18)
     
-    def test_manage_create_segment_no_midnight_split(self):
-        """Test manage_create_segment when segment fits in same day."""
-        steps = []
-        segment = self.generator.manage_create_segment(
-            "DRIVING", 3, "Drive", 10, 50, steps, miles_moved=200
+    def test_emit_segment_no_midnight_split(self):
+        """Test _emit_segment when segment fits in same day."""
+        steps, (end_hour, elapsed_end) = self._emit(
+            "DRIVING", 3, "Drive", 10, 50, miles_moved=200
         )
         
-        # Should return segment directly without splitting
-        self.assertEqual(segment['duration'], 3)
-        self.assertEqual(len(steps), 0)  # No splits, so nothing appended yet
+        # Should yield the segment without splitting
+        self.assertEqual(len(steps), 1)
+        self.assertEqual(steps[0].duration, 3)
+        self.assertEqual((end_hour, elapsed_end), (13, 53))
     
-    def test_manage_create_segment_with_midnight_split(self):
-        """Test manage_create_segment when segment crosses midnight."""
-        steps = []
+    def test_emit_segment_with_midnight_split(self):
+        """Test _emit_segment when segment crosses midnight."""
         # elapsed_start=22 means 22 hours have passed (22 % 24 = 22, rest of day = 22)
         # With 4-hour duration: 22 + 4 = 26, which is > 24, so it splits
-        segment = self.generator.manage_create_segment(
-            "DRIVING", 4, "Night Drive", 22, 22, steps, miles_moved=300
+        steps, (end_hour, elapsed_end) = self._emit(
+            "DRIVING", 4, "Night Drive", 22, 22, miles_moved=300
         )
         
-        # Should have split into two parts
-        self.assertEqual(len(steps), 1)  # First part appended
-        self.assertEqual(steps[0]['duration'], 2)  # 22:00 to 24:00 = 2 hours
+        # Should have split into two parts, both yielded
+        self.assertEqual(len(steps), 2)
+        self.assertEqual(steps[0].duration, 2)  # 22:00 to 24:00 = 2 hours
+        self.assertEqual(steps[1].duration, 2)  # 00:00 to 02:00 = 2 hours
+        self.assertEqual(steps[1].start_hour, 0)
         
-        # Returned segment is second part
-        self.assertEqual(segment['duration'], 2)  # 00:00 to 02:00 = 2 hours
-        self.assertEqual(segment['start_hour'], 0)
+        # Returned position is the end of the second part
+        self.assertEqual((end_hour, elapsed_end), (2, 26))
     
-    def test_manage_create_segment_distributes_miles(self):
+    def test_emit_segment_distributes_miles(self):
         """Test that miles are distributed correctly when splitting."""
-        steps = []
         # elapsed_start=22, 4-hour drive crossing midnight with 300 miles
         # 22 + 4 = 26, which is > 24, so it splits
-        segment = self.generator.manage_create_segment(
-            "DRIVING", 4, "Drive", 22, 22, steps, miles_moved=300
+        steps, _ = self._emit(
+            "DRIVING", 4, "Drive", 22, 22, miles_moved=300
         )
         
         # First part: 2 hours out of 4 = 150 miles
-        self.assertEqual(steps[0]['miles_moved'], 150)
+        self.assertEqual(steps[0].miles_moved, 150)
         # Second part: 2 hours out of 4 = 150 miles
-        self.assertEqual(segment['miles_moved'], 150)
+        self.assertEqual(steps[1].miles_moved, 150)
+    
+    def test_emit_segment_splits_every_midnight(self):
+        """Test that a segment longer than a day is split at each midnight."""
+        # 34-hour restart starting at 20:00 crosses two midnights
+        steps, _ = self._emit(
+            "OFF_DUTY", 34, "34h Cycle Restart", 20, 20
+        )
+        
+        self.assertEqual([s.duration for s in steps], [4, 24, 6])
+        self.assertEqual([s.start_hour for s in steps], [20, 0, 0])
+        self.assertEqual([s.day_number for s in steps], [1, 2, 3])
     
     @patch('django.conf.settings')
     def test_generate_steps_basic_flow(self, mock_settings):
@@ -188,10 +554,10 @@ class StepsGeneratorTests(TestCase):
         self.assertIsInstance(steps, list)
         
         # First segment should be OFF_DUTY (from hour 0 to START_DUTY_HOUR)
-        self.assertEqual(steps[0]['status'], 'OFF_DUTY')
+        self.assertEqual(steps[0].status, 'OFF_DUTY')
         
         # Should contain DRIVING and ON_DUTY segments
-        statuses = [s['status'] for s in steps]
+        statuses = [s.status for s in steps]
         self.assertIn('DRIVING', statuses)
         self.assertIn('ON_DUTY', statuses)
     
@@ -217,7 +583,7 @@ class StepsGeneratorTests(TestCase):
         steps = generator.generate_steps(80467, 80467)  # ~50 miles each
         
         # Last segments should include dropoff and final OFF_DUTY
-        labels = [s['label'] for s in steps[-3:]]
+        labels = [s.label for s in steps[-3:]]
         self.assertIn('Drop-off Unloading', labels)
     
     @patch('django.conf.settings')
@@ -244,6 +610,334 @@ class StepsGeneratorTests(TestCase):
         steps = generator.generate_steps(dist_to_pickup, dist_to_dropoff)
         
         # Total miles driven should cover the distance
-        total_miles = sum(s.get('miles_moved', 0) for s in steps)
+        total_miles = sum(s.miles_moved for s in steps)
         # Should have driven at least the required distance (accounting for rounding)
         self.assertGreater(total_miles, 95)  # ~100 miles total
+    
+    def test_summary_totals_schedule(self):
+        """Test that summary aggregates miles, hours and days of a schedule."""
+        steps = StepsGenerator(cycle_used_hrs=0).generate_steps(300 / 0.000621371, 2200 / 0.000621371)
+        
+        summary = StepsGenerator.summary(steps)
+        
+        self.assertEqual(summary["total_miles"], 2500.0)
+        self.assertEqual(summary["total_hours"], steps[-1].elapsed_end)
+        self.assertEqual(summary["days"], steps[-1].day_number)
+        self.assertAlmostEqual(summary["driving_hours"], sum(s.duration for s in steps if s.status == "DRIVING"), places=4)
+        self.assertAlmostEqual(summary["on_duty_hours"], sum(s.duration for s in steps if s.status == "ON_DUTY"), places=4)
+    
+    def test_summary_of_empty_schedule(self):
+        """Test that an empty schedule sums to zero."""
+        self.assertEqual(
+            StepsGenerator.summary([]),
+            {"total_miles": 0.0, "total_hours": 0.0, "driving_hours": 0.0, "on_duty_hours": 0.0, "days": 0},
+        )
+    
+    def test_generate_steps_long_trip_schedule(self):
+        """Test the full schedule of a multi-day trip against a known-good timeline."""
+        # 300 miles to pickup, 2200 miles to dropoff
+        steps = StepsGenerator(cycle_used_hrs=0).generate_steps(300 / 0.000621371, 2200 / 0.000621371)
+        
+        expected = [
+            ("OFF_DUTY", "OFF_DUTY", 6.5, 1),
+            ("ON_DUTY", "Pre-trip Inspection", 0.5, 1),
+            ("DRIVING", "Driving", 5.4545, 1),
+            ("ON_DUTY", "Pickup Loading", 1, 1),
+            ("DRIVING", "Driving", 2.5455, 1),
+            ("OFF_DUTY", "0.5h Break", 0.5, 1),
+            ("DRIVING", "Driving", 3, 1),
+            ("SLEEPER", "10-hour Sleep", 4.5, 1),
+            ("SLEEPER", "10-hour Sleep", 5.5, 2),
+            ("DRIVING", "Driving", 8, 2),
+            ("ON_DUTY", "Fueling", 0.5, 2),
+            ("OFF_DUTY", "0.5h Break", 0.5, 2),
+            ("DRIVING", "Driving", 3, 2),
+            ("SLEEPER", "10-hour Sleep", 6.5, 2),
+            ("SLEEPER", "10-hour Sleep", 3.5, 3),
+            ("DRIVING", "Driving", 8, 3),
+            ("OFF_DUTY", "0.5h Break", 0.5, 3),
+            ("DRIVING", "Driving", 3, 3),
+            ("SLEEPER", "10-hour Sleep", 9, 3),
+            ("SLEEPER", "10-hour Sleep", 1, 4),
+            ("DRIVING", "Driving", 8, 4),
+            ("ON_DUTY", "Fueling", 0.5, 4),
+            ("OFF_DUTY", "0.5h Break", 0.5, 4),
+            ("DRIVING", "Driving", 3, 4),
+            ("SLEEPER", "10-hour Sleep", 10, 4),
+            ("DRIVING", "Driving", 1, 4),
+            ("DRIVING", "Driving", 0.4545, 5),
+            ("ON_DUTY", "Drop-off Unloading", 1, 5),
+            ("OFF_DUTY", "OFF_DUTY", 22.5455, 5),
+        ]
+        actual = [(s.status, s.label, round(s.duration, 4), s.day_number) for s in steps]
+        self.assertEqual(actual, expected)
+        self.assertAlmostEqual(steps[-1].elapsed_end, 120)
+    
+    def test_generate_steps_never_drives_past_break_limit(self):
+        """Test that driving since the last break never exceeds BREAK_AFTER, even around fuel stops."""
+        from django.conf import settings
+        steps = StepsGenerator(cycle_used_hrs=0).generate_steps(300 / 0.000621371, 6000 / 0.000621371)
+        
+        driven_since_break = 0
+        for step in steps:
+            if step.status == "DRIVING":
+                driven_since_break += step.duration
+                self.assertLessEqual(driven_since_break, settings.BREAK_AFTER + 1e-9)
+            elif step.status in ("OFF_DUTY", "SLEEPER"):
+                driven_since_break = 0
+    
+    def test_generate_steps_is_memoized(self):
+        """Test that identical trips reuse the cached schedule."""
+        first_generator = StepsGenerator(cycle_used_hrs=10)
+        first = first_generator.generate_steps(80467, 80467)
+        second_generator = StepsGenerator(cycle_used_hrs=10)
+        second = second_generator.generate_steps(80467, 80467)
+        
+        self.assertEqual(_cached_schedule.cache_info().hits, 1)
+        self.assertEqual(first, second)
+        self.assertIsNot(first, second)
+        self.assertEqual(first_generator.cycle_remaining, second_generator.cycle_remaining)
+    
+    def test_generate_steps_cache_follows_settings(self):
+        """Test that changing an HOS setting does not serve a stale schedule."""
+        default_steps = StepsGenerator().generate_steps(80467, 80467)
+        with override_settings(AVG_SPEED_MPH=30):
+            slow_steps = StepsGenerator().generate_steps(80467, 80467)
+        
+        self.assertNotEqual(default_steps, slow_steps)
+    
+    def test_iter_steps_matches_generate_steps(self):
+        """Test that the streaming generator yields the same schedule."""
+        streamed = StepsGenerator(cycle_used_hrs=0).iter_steps(80467, 80467)
+        
+        self.assertNotIsInstance(streamed, list)
+        self.assertEqual(list(streamed), StepsGenerator(cycle_used_hrs=0).generate_steps(80467, 80467))
+    
+    def test_init_follows_overridden_settings(self):
+        """Test that the HOS settings snapshot is refreshed when a setting changes."""
+        from django.conf import settings
+        with override_settings(MAX_CYCLE_HOURS=70):
+            self.assertEqual(StepsGenerator(cycle_used_hrs=10).cycle_remaining, 60)
+        
+        self.assertEqual(StepsGenerator(cycle_used_hrs=10).cycle_remaining, settings.MAX_CYCLE_HOURS - 10)
+    
+    def test_generate_steps_uses_given_hos_settings(self):
+        """Test that a schedule is built with, and cached under, the generator's own HOS settings."""
+        from logs.services import _hos_settings
+        custom = _hos_settings._replace(SLEEPER_BREAK_HOURS=8)
+        
+        custom_labels = {s.label for s in StepsGenerator(hos_settings=custom).generate_steps(80467, 2000000)}
+        default_labels = {s.label for s in StepsGenerator().generate_steps(80467, 2000000)}
+        
+        self.assertIn("8-hour Sleep", custom_labels)
+        self.assertNotIn("10-hour Sleep", custom_labels)
+        self.assertIn("10-hour Sleep", default_labels)
+    
+    @override_settings(SLEEPER_BREAK_HOURS=8, BREAK_DURATION=1)
+    def test_generate_steps_labels_follow_settings(self):
+        """Test that break and sleep labels reflect the configured durations."""
+        labels = {s.label for s in StepsGenerator().generate_steps(300 / 0.000621371, 800 / 0.000621371)}
+        
+        self.assertIn("8-hour Sleep", labels)
+        self.assertIn("1h Break", labels)
+        self.assertNotIn("10-hour Sleep", labels)
+    
+    def test_generate_steps_charges_on_duty_stops_to_cycle(self):
+        """Test that inspection, pickup and drop-off time all count against the cycle."""
+        from django.conf import settings
+        generator = StepsGenerator(cycle_used_hrs=0)
+        steps = generator.generate_steps(80467, 80467)
+        
+        on_duty = sum(s.duration for s in steps if s.status in ("ON_DUTY", "DRIVING"))
+        self.assertAlmostEqual(generator.cycle_remaining, settings.MAX_CYCLE_HOURS - on_duty)
+
+
+class ORJSONRendererTests(TestCase):
+    """Test suite for ORJSONRenderer class."""
+    
+    def test_render_matches_json_renderer(self):
+        """Test that the output is the same document as DRF's JSONRenderer."""
+        data = {
+            "steps": [{"status": "DRIVING", "duration": 5.4545, "label": "Drive \u2028 é"}],
+            "total": Decimal("1.5"),
+            "created": datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+            "days": {1: "Monday"},
+        }
+        
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+    
+    def test_render_indented_response(self):
+        """Test that an indented media type is still honoured."""
+        rendered = ORJSONRenderer().render({"a": 1}, "application/json; indent=2")
+        
+        self.assertEqual(rendered, b'{\n  "a": 1\n}')
+    
+    def test_render_none(self):
+        """Test that no data renders an empty body."""
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+
+class LogsViewTests(TestCase):
+    """Test suite for LogsView."""
+    
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.url = reverse("logs")
+        self.payload = {"start": [40.7128, -74.0060], "pickup": [40.7580, -73.9855], "dropoff": [40.7489, -73.9680], "cycle_used": 10}
+        cache.clear()
+    
+    @patch('logs.services.requests.Session.post')
+    def test_post_returns_distances_and_steps(self, mock_post):
+        """Test that the view answers with ORS distances and the generated schedule."""
+        mock_post.return_value = ors_response([80467, 80467], geometry="abc")
+        
+        response = self.client.post(self.url, self.payload, content_type="application/json")
+        
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["distance_to_pickup_meters"], 80467)
+        self.assertEqual(data["distance_to_dropoff_meters"], 80467)
+        self.assertNotIn("route_geometry", data)
+        self.assertAlmostEqual(data["totals"]["total_miles"], 100, places=3)
+        self.assertEqual(data["steps"][0]["status"], "OFF_DUTY")
+        # Coordinates are sent to ORS as [lng, lat]
+        self.assertEqual(orjson.loads(mock_post.call_args[1]["data"])["coordinates"][0], [-74.0060, 40.7128])
+    
+    @patch('logs.services.requests.Session.post')
+    def test_post_reports_ors_errors(self, mock_post):
+        """Test that ORS errors are returned as a 400 with the API details."""
+        mock_response = Mock(status_code=403, ok=False, text="quota exceeded")
+        mock_response.raise_for_status.side_effect = requests.HTTPError(response=mock_response)
+        mock_post.return_value = mock_response
+        
+        response = self.client.post(self.url, self.payload, content_type="application/json")
+        
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"error": "Erreur API ORS", "details": "quota exceeded"})
+    
+    @patch('logs.services.requests.Session.post')
+    def test_post_reports_malformed_ors_response(self, mock_post):
+        """Test that a 200 ORS answer that is not JSON is reported as unavailable, not as bad input."""
+        mock_post.return_value = Mock(status_code=200, ok=True, content=b"<html>Bad gateway</html>")
+        
+        with patch('logs.services.ORS_CIRCUIT_BREAKER', CircuitBreaker(failure_threshold=5, reset_timeout=30)):
+            response = self.client.post(self.url, self.payload, content_type="application/json")
+        
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()["error"], "API ORS indisponible")
+    
+    @patch('logs.services.ORS_CIRCUIT_BREAKER.before_call')
+    def test_post_reports_unavailable_ors(self, mock_before_call):
+        """Test that an unreachable ORS is answered with a 503."""
+        mock_before_call.side_effect = CircuitOpenError("circuit open")
+        
+        response = self.client.post(self.url, self.payload, content_type="application/json")
+        
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()["error"], "API ORS indisponible")
+    
+    def test_post_rejects_invalid_coordinates(self):
+        """Test that out-of-range coordinates are answered with a 400."""
+        self.payload["pickup"] = [95, -73.9855]
+        
+        response = self.client.post(self.url, self.payload, content_type="application/json")
+        
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {
+            "error": "Coordonnées invalides",
+            "details": "start, pickup and dropoff must be [lat, lng] with lat in [-90, 90] and lng in [-180, 180]",
+        })
+    
+    @patch('logs.services.requests.Session.post')
+    def test_post_rejects_malformed_payload(self, mock_post):
+        """Test that missing or malformed waypoints are answered with a 400 before calling ORS."""
+        malformed = (
+            ("start", None),
+            ("pickup", [40.7580]),
+            ("dropoff", ["a", "b"]),
+            ("dropoff", "ab"),
+            ("start", "12"),
+            ("pickup", ["40.7580", "-73.9855"]),
+            ("dropoff", [True, False]),
+            ("start", [10 ** 400, 1]),
+        )
+        for key, value in malformed:
+            response = self.client.post(self.url, {**self.payload, key: value}, content_type="application/json")
+            
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()["error"], "Coordonnées invalides")
+        del self.payload["start"]
+        response = self.client.post(self.url, self.payload, content_type="application/json")
+        
+        self.assertEqual(response.status_code, 400)
+        mock_post.assert_not_called()
+    
+    @patch('logs.services.requests.Session.post')
+    def test_post_rejects_invalid_cycle_used(self, mock_post):
+        """Test that a cycle_used that is not a non-negative number is answered with a 400."""
+        for cycle_used in ("abc", None, -1, "nan", 10 ** 400):
+            self.payload["cycle_used"] = cycle_used
+            
+            response = self.client.post(self.url, self.payload, content_type="application/json")
+            
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()["error"], "Cycle invalide")
+        mock_post.assert_not_called()
+
+
+class LogsGeometryViewTests(TestCase):
+    """Test suite for LogsGeometryView."""
+    
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.url = reverse("logs-geometry")
+        self.params = {"start": "40.7128,-74.0060", "pickup": "40.7580,-73.9855", "dropoff": "40.7489,-73.9680"}
+        cache.clear()
+    
+    @patch('logs.services.requests.Session.post')
+    def test_get_returns_cacheable_geometry(self, mock_post):
+        """Test that the geometry is returned with the leg distances and a long-lived Cache-Control."""
+        mock_post.return_value = ors_response([80467, 80467], geometry="abc")
+        
+        response = self.client.get(self.url, self.params)
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            "distance_to_pickup_meters": 80467,
+            "distance_to_dropoff_meters": 80467,
+            "route_geometry": "abc",
+        })
+        self.assertIn("public", response["Cache-Control"])
+        self.assertIn("max-age=86400", response["Cache-Control"])
+        # Coordinates are sent to ORS as [lng, lat] numbers
+        self.assertEqual(orjson.loads(mock_post.call_args[1]["data"])["coordinates"][0], [-74.0060, 40.7128])
+    
+    @patch('logs.services.requests.Session.post')
+    def test_get_shares_route_cache_with_logs_view(self, mock_post):
+        """Test that the geometry and the schedule of a trip need a single ORS call."""
+        mock_post.return_value = ors_response([80467, 80467], geometry="abc")
+        payload = {"start": [40.7128, -74.0060], "pickup": [40.7580, -73.9855], "dropoff": [40.7489, -73.9680]}
+        
+        self.client.post(reverse("logs"), payload, content_type="application/json")
+        self.client.get(self.url, self.params)
+        
+        mock_post.assert_called_once()
+    
+    def test_get_rejects_out_of_range_coordinates(self):
+        """Test that out-of-range coordinates are described in the API's [lat, lng] order."""
+        response = self.client.get(self.url, {**self.params, "pickup": "95,-73.9855"})
+        
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json()["details"],
+            "start, pickup and dropoff must be [lat, lng] with lat in [-90, 90] and lng in [-180, 180]",
+        )
+    
+    def test_get_rejects_malformed_coordinates(self):
+        """Test that missing or malformed coordinates are answered with a 400."""
+        for params in ({"start": "40.7128,-74.0060"}, {**self.params, "pickup": "40.7580"}, {**self.params, "dropoff": "a,b"}):
+            response = self.client.get(self.url, params)
+            
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()["error"], "Coordonnées invalides")
+            self.assertNotIn("Cache-Control", response)
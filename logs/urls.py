@@ -1,6 +1,7 @@
 from django.urls import path
-from .views import LogsView
+from .views import LogsGeometryView, LogsView
 
 urlpatterns = [
     path("", LogsView.as_view(), name="logs"),
+    path("geometry/", LogsGeometryView.as_view(), name="logs-geometry"),
 ]
\ No newline at end of file
@@ -1,51 +1,155 @@
+import math
+
+from django.conf import settings
+from django.utils.cache import patch_cache_control
+import requests
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 
-from .services import DistaneCalculator, StepsGenerator
+from .renderers import ORJSONRenderer
+from .services import METERS_TO_MILES, DistaneCalculator, InvalidCoordinatesError, StepsGenerator
 
+# Try driving-car first (more permissive), fallback if needed
+ORS_DIRECTIONS_ENDPOINT = "https://api.openrouteservice.org/v2/directions/driving-car"
 
-class LogsView(APIView):
-    def post(self, request):
+COORDINATES_RANGE_DETAILS = (
+    "start, pickup and dropoff must be [lat, lng] with lat in [-90, 90] and lng in [-180, 180]"
+)
+
+
+def parse_waypoints(points):
+    """Coerce [lat, lng] pairs sent by the frontend into the (lng, lat) floats ORS expects.
+    
+    Args:
+        points (iterable): Start, pickup and dropoff as [lat, lng] pairs
         
-        # Frontend sends [lat, lng] but ORS expects [lng, lat], so we swap them
-        start_coords = request.data.get('start')   # [lat, lng] from frontend
-        pickup_coords = request.data.get('pickup') # [lat, lng] from frontend
-        dropoff_coords = request.data.get('dropoff') # [lat, lng] from frontend
-        cycle_used = float(request.data.get('cycle_used', 0))
+    Returns:
+        list: (longitude, latitude) tuples, in the same order
         
-        # Swap coordinates to [lng, lat] for OpenRouteService
-        start_coords = [start_coords[1], start_coords[0]]
-        pickup_coords = [pickup_coords[1], pickup_coords[0]]
-        dropoff_coords = [dropoff_coords[1], dropoff_coords[0]]
-
-        # Try driving-car first (more permissive), fallback if needed
-        distance_calculator = DistaneCalculator("https://api.openrouteservice.org/v2/directions/driving-car")
-        response = distance_calculator.calculate_distance(start_coords, pickup_coords, dropoff_coords)
-        print(response.status_code, response.text)
-        if response.status_code != 200:
-            return Response({"error": "Erreur API ORS", "details": response.text}, status=400)
-
-        data = response.json()
-        route = data['routes'][0]
+    Raises:
+        TypeError: If a value is not a number (booleans are rejected)
+        ValueError: If a point is not a list or tuple of two values, or does not fit in a float
+    """
+    waypoints = []
+    for point in points:
+        if not isinstance(point, (list, tuple)) or len(point) != 2:
+            raise ValueError(f"Expected a [lat, lng] pair, got {point!r}")
+        if any(isinstance(value, bool) or not isinstance(value, (int, float)) for value in point):
+            raise TypeError(f"Expected numeric coordinates, got {point!r}")
+        lat, lng = point
+        try:
+            waypoints.append((float(lng), float(lat)))
+        except OverflowError as exc:
+            # JSON integers are unbounded and may not fit in a float
+            raise ValueError(f"Coordinates out of range, got {point!r}") from exc
+    return waypoints
+
+
+def calculate_route(start_coords, pickup_coords, dropoff_coords):
+    """Fetch the trip route from ORS, turning failures into error responses.
+    
+    Args:
+        start_coords (tuple): Starting coordinates (longitude, latitude)
+        pickup_coords (tuple): Pickup location coordinates (longitude, latitude)
+        dropoff_coords (tuple): Dropoff location coordinates (longitude, latitude)
+    
+    Returns:
+        tuple: (RouteSummary, None) on success, (None, Response) describing the error otherwise
+    """
+    distance_calculator = DistaneCalculator(ORS_DIRECTIONS_ENDPOINT)
+    try:
+        return distance_calculator.calculate_distance(start_coords, pickup_coords, dropoff_coords), None
+    except InvalidCoordinatesError:
+        # The service works in ORS's [lng, lat] order: describe the API's own contract instead
+        return None, Response({"error": "Coordonnées invalides", "details": COORDINATES_RANGE_DETAILS}, status=400)
+    except requests.HTTPError as exc:
+        return None, Response({"error": "Erreur API ORS", "details": exc.response.text}, status=400)
+    except requests.RequestException as exc:
+        return None, Response({"error": "API ORS indisponible", "details": str(exc)}, status=503)
+
+
+class LogsView(APIView):
+    renderer_classes = [ORJSONRenderer, BrowsableAPIRenderer]
+
+    def post(self, request):
         
+        try:
+            # Frontend sends [lat, lng] but ORS expects [lng, lat], so we swap them
+            start_coords, pickup_coords, dropoff_coords = parse_waypoints(
+                request.data[key] for key in ('start', 'pickup', 'dropoff')
+            )
+        except (KeyError, TypeError, ValueError):
+            return Response(
+                {"error": "Coordonnées invalides", "details": "start, pickup and dropoff are required as [lat, lng]"},
+                status=400,
+            )
+        try:
+            cycle_used = float(request.data.get('cycle_used', 0))
+        except (TypeError, ValueError, OverflowError):
+            cycle_used = math.nan
+        if not (math.isfinite(cycle_used) and cycle_used >= 0):
+            return Response(
+                {"error": "Cycle invalide", "details": "cycle_used must be a non-negative number of hours"},
+                status=400,
+            )
+
+        route, error = calculate_route(start_coords, pickup_coords, dropoff_coords)
+        if error is not None:
+            return error
+
         # OpenRouteService renvoie un segment par intervalle entre deux coordonnées
         # Segment 0: Start -> Pickup
         # Segment 1: Pickup -> Dropoff
-        segments = route['segments']
-        
-        dist_to_pickup = segments[0]['distance'] # en mètres
-        dist_to_dropoff = segments[1]['distance'] # en mètres
+        dist_to_pickup, dist_to_dropoff = route.distances # en mètres
         
         # Calcul HOS avec les deux distances séparées
         steps_generator = StepsGenerator(cycle_used)
         steps = steps_generator.generate_steps(dist_to_pickup, dist_to_dropoff)
         total_distance = dist_to_pickup + dist_to_dropoff
+        # La géométrie est servie par LogsGeometryView
         return Response({
             "distance_to_pickup_meters": dist_to_pickup,
             "distance_to_dropoff_meters": dist_to_dropoff,
             "total_distance_meters": total_distance,
-            "total_distance_miles": total_distance * 0.000621371,
-            "route_geometry": route['geometry'], 
-            "steps": steps
+            "total_distance_miles": total_distance * METERS_TO_MILES,
+            "totals": steps_generator.summary(steps),
+            "steps": [step.to_dict() for step in steps]
+        })
+
+
+class LogsGeometryView(APIView):
+    """Route geometry of a trip, for the map.
+    
+    A GET with ``start``, ``pickup`` and ``dropoff`` query parameters given as
+    ``lat,lng``. The route is a deterministic function of the coordinates, so
+    successful responses may be cached by browsers and proxies.
+    """
+    renderer_classes = [ORJSONRenderer, BrowsableAPIRenderer]
+
+    def get(self, request):
+        try:
+            # Frontend sends lat,lng but ORS expects [lng, lat], so we swap them
+            start_coords, pickup_coords, dropoff_coords = parse_waypoints(
+                [float(value) for value in request.query_params[key].split(',')]
+                for key in ('start', 'pickup', 'dropoff')
+            )
+        except (KeyError, TypeError, ValueError):
+            return Response(
+                {"error": "Coordonnées invalides", "details": "start, pickup and dropoff are required as lat,lng"},
+                status=400,
+            )
+
+        route, error = calculate_route(start_coords, pickup_coords, dropoff_coords)
+        if error is not None:
+            return error
+
+        dist_to_pickup, dist_to_dropoff = route.distances
+        response = Response({
+            "distance_to_pickup_meters": dist_to_pickup,
+            "distance_to_dropoff_meters": dist_to_dropoff,
+            "route_geometry": route.geometry,
         })
+        patch_cache_control(response, public=True, max_age=settings.ORS_CACHE_TIMEOUT)
+        return response